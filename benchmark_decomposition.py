@@ -0,0 +1,151 @@
+"""
+Benchmark for time-to-zero-cost of the monolithic SimulatedAnnealing solver
+against DecompositionSolver. The box is scaled up as a grid of base sized
+tiles, so that the rectangle count grows with the box area.
+
+Time is reported only for runs that reach zero cost (within tolerance).
+Other runs are shown as "not reached" together with their final cost.
+
+Usage:
+    python benchmark_decomposition.py --scales 1 2 3 --batch-size 32
+"""
+import argparse
+import time
+import numpy as np
+
+from rectangle import Rectangle
+from box import Box
+from rectangle_mover import RectangleMover
+from cost_analysis import CostAnalyzer
+from simulated_annealing import SimulatedAnnealing
+from decomposition import DecompositionSolver
+
+
+
+def make_box(scale : int,
+             fill_ratio : float,
+             seed : int) -> Box:
+    """
+    Create scale * scale tiles sized box and random rectangles that fill
+    the given ratio of it. Rectangles are created in the same way as in
+    the SimAnn.ipynb demo.
+    """
+    np.random.seed(seed)
+
+    box = Box(size_x=4 * scale, size_y=6 * scale)
+    box_area = box.size_x * box.size_y
+
+    rect_areas = 0
+    rect_count = 0
+    while (rect_areas / box_area) < fill_ratio:
+
+        size_x = 0.2 + np.random.rand() * 2
+        size_y = 0.2 + np.random.rand() * 2
+        max_rect_area = box_area * fill_ratio - rect_areas
+        if (size_x * size_y) > max_rect_area:
+            size_y = max_rect_area / size_x
+            if size_y < 0.1:
+                break
+
+        rect_count += 1
+        color = np.random.rand(4)
+        color[3] = 0.4
+        box.add_rectangle(Rectangle(
+            name='Rect{}'.format(rect_count),
+            size_x=size_x,
+            size_y=size_y,
+            color=color
+        ))
+        rect_areas += size_x * size_y
+
+    return box
+
+
+def run_monolithic(box : Box,
+                   args : argparse.Namespace) -> tuple:
+
+    rect_mover = RectangleMover()
+    rect_mover.random_initialization(box)
+    sa = SimulatedAnnealing(
+        iterations=len(box.rectangles) * args.iterations_per_rectangle,
+        early_stop=True,
+        start_temperature=1.0,
+        end_temperature=0.0,
+        rect_mover=rect_mover,
+        cost_analyzer=CostAnalyzer(),
+        batch_size=args.batch_size
+    )
+    start = time.time()
+    sa.optimize(box)
+    return time.time() - start, CostAnalyzer().analyze_fast(box)
+
+
+def run_decomposition(box : Box,
+                      scale : int,
+                      args : argparse.Namespace) -> tuple:
+
+    solver = DecompositionSolver(
+        regions_x=scale,
+        regions_y=scale,
+        iterations_per_rectangle=args.iterations_per_rectangle,
+        start_temperature=1.0,
+        end_temperature=0.0,
+        rect_mover=RectangleMover(),
+        cost_analyzer=CostAnalyzer(),
+        batch_size=args.batch_size,
+        cost_tolerance=args.tolerance,
+        max_workers=args.max_workers
+    )
+    start = time.time()
+    solver.optimize(box)
+    return time.time() - start, CostAnalyzer().analyze_fast(box)
+
+
+def time_to_zero(run_time : float,
+                 cost : float,
+                 tolerance : float) -> str:
+
+    if cost <= tolerance:
+        return '{:0.2f}s'.format(run_time)
+    return 'not reached'
+
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 2, 3])
+    parser.add_argument('--fill-ratio', type=float, default=0.7)
+    parser.add_argument('--iterations-per-rectangle', type=int, default=1000)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--max-workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=313)
+    parser.add_argument('--tolerance', type=float, default=1e-9)
+    args = parser.parse_args()
+
+    results = []
+    for scale in args.scales:
+        box = make_box(scale, args.fill_ratio, args.seed)
+        mono_time, mono_cost = run_monolithic(box, args)
+
+        box = make_box(scale, args.fill_ratio, args.seed)
+        dec_time, dec_cost = run_decomposition(box, scale, args)
+
+        results.append((scale, len(box.rectangles), mono_time, mono_cost, dec_time, dec_cost))
+
+    print()
+    print('{:>6} {:>6} {:>12} {:>12} {:>12} {:>12}'.format(
+        'Scale', 'Rects', 'Mono time', 'Mono cost', 'Dec time', 'Dec cost'
+    ))
+    for scale, rect_count, mono_time, mono_cost, dec_time, dec_cost in results:
+        print('{:>6} {:>6} {:>12} {:>12.3f} {:>12} {:>12.3f}'.format(
+            scale,
+            rect_count,
+            time_to_zero(mono_time, mono_cost, args.tolerance),
+            mono_cost,
+            time_to_zero(dec_time, dec_cost, args.tolerance),
+            dec_cost
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,4 @@
+import numpy as np
 from rectangle import Rectangle
 
 
@@ -21,4 +22,24 @@ class Box:
     def add_rectangle(self, 
                       rectangle : Rectangle) -> None: 
         
-        self.rectangles.append(rectangle)
\ No newline at end of file
+        self.rectangles.append(rectangle)
+
+
+    def rectangle_arrays(self) -> tuple: 
+        """
+        Collect the effective position, size, rotation and name of all 
+        rectangles into numpy arrays (x, y, size_x, size_y, rotated, names). 
+        These are used by the vectorized cost and move calculations. 
+        
+        The arrays are copies. The rectangle objects still hold the actual 
+        positions, so the arrays must be updated when rectangles are moved, 
+        see RectangleMover.apply_move. 
+        """
+        x = np.array([rect.x for rect in self.rectangles], dtype=np.float64)
+        y = np.array([rect.y for rect in self.rectangles], dtype=np.float64)
+        size_x = np.array([rect.size_x for rect in self.rectangles], dtype=np.float64)
+        size_y = np.array([rect.size_y for rect in self.rectangles], dtype=np.float64)
+        rotated = np.array([rect.rotated for rect in self.rectangles], dtype=bool)
+        names = np.array([rect.name for rect in self.rectangles])
+        
+        return x, y, size_x, size_y, rotated, names
@@ -0,0 +1,126 @@
+"""
+Consistency check for the vectorized cost analysis. Compares
+CostAnalyzer.analyze_fast and CostAnalyzer.analyze_moves against the
+original CostAnalyzer.analyze, including rotated rectangles and rectangles
+that are partially outside of the box. Also runs batched SimulatedAnnealing
+with both batch rules and checks that the cost tracked from the deltas
+matches the real cost of the final state.
+
+Usage:
+    python check_cost_analysis.py
+"""
+import numpy as np
+
+from rectangle import Rectangle
+from box import Box
+from rectangle_mover import RectangleMover
+from cost_analysis import CostAnalyzer
+from simulated_annealing import SimulatedAnnealing
+
+
+
+def make_box(rect_count : int,
+             seed : int) -> Box:
+
+    np.random.seed(seed)
+    box = Box(size_x=6, size_y=8)
+    for i in range(rect_count):
+        rect = Rectangle(
+            name='Rect{}'.format(i + 1),
+            size_x=0.2 + np.random.rand() * 2,
+            size_y=0.2 + np.random.rand() * 2,
+            color=np.random.rand(4)
+        )
+        rect.rotated = np.random.rand() < 0.5
+        box.add_rectangle(rect)
+
+    RectangleMover().random_initialization(box)
+
+    # Push some rectangles partially outside of the box
+    for rect in box.rectangles[::5]:
+        rect.x = rect.x - 1.0
+
+    return box
+
+
+def check(rect_count : int = 30,
+          n_moves : int = 200,
+          seed : int = 313,
+          tolerance : float = 1e-9) -> None:
+
+    box = make_box(rect_count, seed)
+    rect_mover = RectangleMover()
+    cost_analyzer = CostAnalyzer()
+
+    # Total cost
+    cost = cost_analyzer.analyze(box)
+    fast_cost = cost_analyzer.analyze_fast(box)
+    assert abs(cost - fast_cost) <= tolerance * max(1, abs(cost)), (cost, fast_cost)
+
+    # Cost deltas of single moves. Low progress fraction gives large moves
+    # and rotation for most of the proposals.
+    arrays = box.rectangle_arrays()
+    indices, new_x, new_y, new_rotated = rect_mover.propose_moves(
+        box,
+        arrays,
+        progress_fraction=0.2,
+        n_moves=n_moves
+    )
+    deltas = cost_analyzer.analyze_moves(box, arrays, indices, new_x, new_y, new_rotated)
+
+    max_error = 0
+    for k in range(n_moves):
+        rect = box.rectangles[indices[k]]
+        rect.new_x = new_x[k]
+        rect.new_y = new_y[k]
+        rect.new_rotated = bool(new_rotated[k])
+        rect.new_pos_available = True
+        new_cost = cost_analyzer.analyze(box)
+        rect_mover.reject_moves(box)
+
+        error = abs((new_cost - cost) - deltas[k])
+        assert error <= tolerance * max(1, abs(new_cost)), (k, new_cost - cost, deltas[k])
+        max_error = max(max_error, error)
+
+    rotations = np.sum(new_rotated != arrays[4][indices])
+    print('Total cost: {:0.6f}, vectorized: {:0.6f}'.format(cost, fast_cost))
+    print('Checked {} moves ({} with rotation), max delta error {:0.3e}'.format(
+        n_moves, rotations, max_error
+    ))
+
+
+def check_batched(rect_count : int = 30,
+                  iterations : int = 3000,
+                  seed : int = 313,
+                  tolerance : float = 1e-9) -> None:
+
+    for batch_rule in ('metropolis', 'heat_bath'):
+        box = make_box(rect_count, seed)
+        cost_analyzer = CostAnalyzer()
+
+        # Resync is effectively disabled, so that the final cost comes from
+        # the accumulated deltas and the arrays updated by apply_move.
+        sa = SimulatedAnnealing(
+            iterations=iterations,
+            early_stop=False,
+            start_temperature=1.0,
+            end_temperature=0.0,
+            rect_mover=RectangleMover(),
+            cost_analyzer=cost_analyzer,
+            batch_size=16,
+            batch_rule=batch_rule,
+            resync_interval=iterations + 1
+        )
+        sa.optimize(box)
+
+        tracked_cost = sa.cost_log[-1]
+        cost = cost_analyzer.analyze(box)
+        assert abs(tracked_cost - cost) <= tolerance * max(1, abs(cost)), (batch_rule, tracked_cost, cost)
+        print('{}: {} accepted moves, tracked cost {:0.6f}, real cost {:0.6f}'.format(
+            batch_rule, sa.accepted_moves, tracked_cost, cost
+        ))
+
+
+if __name__ == '__main__':
+    check()
+    check_batched()
@@ -0,0 +1,351 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from rectangle import Rectangle
+from box import Box
+from rectangle_mover import RectangleMover
+from cost_analysis import CostAnalyzer
+from simulated_annealing import SimulatedAnnealing
+
+
+
+class ActiveRectangleMover(RectangleMover):
+    """
+    Rectangle mover that only moves the rectangles listed in active_indices.
+    Other rectangles stay fixed, but they are still part of the cost analysis.
+    This is used in the boundary repair pass of the decomposition solver.
+    """
+
+    def __init__(self,
+                 active_indices : np.ndarray,
+                 max_move_limit : float = 10.0,
+                 min_move_limit : float = 0.02) -> None:
+
+        super().__init__(max_move_limit=max_move_limit, min_move_limit=min_move_limit)
+        self.active_indices = np.asarray(active_indices)
+
+
+    def select_random_rectangle(self,
+                                box : Box) -> Rectangle:
+
+        rect = box.rectangles[np.random.choice(self.active_indices)]
+        return rect
+
+
+    def select_random_indices(self,
+                              box : Box,
+                              n_moves : int) -> np.ndarray:
+
+        indices = np.random.choice(self.active_indices, size=n_moves)
+        return indices
+
+
+
+def anneal_region(region : dict) -> dict:
+    """
+    Worker function for annealing one region. The region box uses local
+    coordinates, i.e. its lower left corner is at origin.
+
+    This is a module level function, so that it can be sent to worker
+    processes.
+    """
+    # Each worker gets its own seed. Otherwise forked processes would
+    # continue from the same random state. The global random state is
+    # restored afterwards, because with max_workers=1 this runs in the
+    # calling process.
+    random_state = np.random.get_state()
+    np.random.seed(region['seed'])
+    try:
+        box = region['box']
+        rect_mover = region['rect_mover']
+        rect_mover.random_initialization(box)
+
+        sa = SimulatedAnnealing(
+            iterations=len(box.rectangles) * region['iterations_per_rectangle'],
+            early_stop=True,
+            start_temperature=region['start_temperature'],
+            end_temperature=region['end_temperature'],
+            rect_mover=rect_mover,
+            cost_analyzer=region['cost_analyzer'],
+            batch_size=region['batch_size'],
+            batch_rule=region['batch_rule'],
+            verbose=False
+        )
+        sa.optimize(box)
+    finally:
+        np.random.set_state(random_state)
+
+    return {
+        'x' : [rect.x for rect in box.rectangles],
+        'y' : [rect.y for rect in box.rectangles],
+        'rotated' : [rect.rotated for rect in box.rectangles],
+        'cost' : sa.cost_log[-1] if len(sa.cost_log) > 0 else 0,
+        'iterations' : len(sa.cost_log)
+    }
+
+
+
+class DecompositionSolver:
+    """
+    Solver for large boxes. The box is split to regions_x * regions_y grid
+    of regions and rectangles are divided between the regions so that each
+    region gets approximately same fill ratio. Each region is then optimized
+    as its own sub-box with SimulatedAnnealing in parallel worker processes.
+
+    Rectangles that stay inside their own region can not overlap with
+    rectangles of other regions. If some region does not reach zero cost,
+    a boundary repair pass is run over the full box. It moves only the
+    rectangles that have nonzero cost or that are near the region seams.
+
+    Note that position history of the rectangles (x_log etc.) contains only
+    the repair pass, since the region optimization is done in the workers.
+    """
+
+    def __init__(self,
+                 regions_x : int,
+                 regions_y : int,
+                 iterations_per_rectangle : int,
+                 start_temperature : float,
+                 end_temperature : float,
+                 rect_mover : RectangleMover,
+                 cost_analyzer : CostAnalyzer,
+                 batch_size : int = 1,
+                 batch_rule : str = 'metropolis',
+                 repair_iterations_per_rectangle : int = 1000,
+                 repair_start_temperature : float = 0.5,
+                 seam_margin : float = None,
+                 cost_tolerance : float = 1e-9,
+                 max_workers : int = None) -> None:
+
+        # Region grid
+        self.regions_x = regions_x
+        self.regions_y = regions_y
+
+        # Region optimization params
+        self.iterations_per_rectangle = iterations_per_rectangle
+        self.start_temperature = start_temperature
+        self.end_temperature = end_temperature
+        self.batch_size = batch_size
+        self.batch_rule = batch_rule
+
+        # Algorithm business logic and cost analysis
+        self.rect_mover = rect_mover
+        self.cost_analyzer = cost_analyzer
+
+        # Boundary repair params. Default seam margin is the longest
+        # rectangle side in the box.
+        self.repair_iterations_per_rectangle = repair_iterations_per_rectangle
+        self.repair_start_temperature = repair_start_temperature
+        self.seam_margin = seam_margin
+
+        # Costs up to this value are rounding errors from moving the region
+        # results to the full box coordinates.
+        self.cost_tolerance = cost_tolerance
+
+        # Number of worker processes. 1 runs everything in this process.
+        self.max_workers = max_workers
+
+        # Debug logging
+        self.region_costs = []
+        self.region_iterations = []
+        self.repair_sa = None
+
+
+    def region_size(self,
+                    box : Box) -> tuple:
+
+        return box.size_x / self.regions_x, box.size_y / self.regions_y
+
+
+    def assign_regions(self,
+                       box : Box) -> list:
+        """
+        Divide rectangles between the regions. Rectangles are handled from
+        the largest to the smallest and each one is given to the region
+        that has lowest fill so far. Returns list of rectangle index lists,
+        one per region.
+        """
+        region_size_x, region_size_y = self.region_size(box)
+        n_regions = self.regions_x * self.regions_y
+
+        areas = np.array([rect.size_x * rect.size_y for rect in box.rectangles])
+        fill = np.zeros(n_regions)
+        assignment = [[] for _ in range(n_regions)]
+
+        for index in np.argsort(-areas, kind='stable'):
+            rect = box.rectangles[index]
+            fits = (rect.size_x <= region_size_x) and (rect.size_y <= region_size_y)
+            fits_rotated = (rect.size_y <= region_size_x) and (rect.size_x <= region_size_y)
+            if not (fits or fits_rotated):
+                raise ValueError(
+                    '{} does not fit in {:0.3f} x {:0.3f} region.'.format(
+                        rect.name, region_size_x, region_size_y
+                    )
+                )
+
+            region = np.argmin(fill)
+            assignment[region].append(int(index))
+            fill[region] += areas[index]
+
+        return assignment
+
+
+    def fits_region(self,
+                    rect : Rectangle,
+                    box : Box) -> bool:
+        """
+        Check if rectangle fits in one region with its current rotation.
+        """
+        region_size_x, region_size_y = self.region_size(box)
+        return (rect.size_x <= region_size_x) and (rect.size_y <= region_size_y)
+
+
+    def make_region(self,
+                    box : Box,
+                    indices : list) -> Box:
+        """
+        Create sub-box for one region. Rectangles are copied, so that the
+        original rectangles are updated only when the results are merged.
+        """
+        region_size_x, region_size_y = self.region_size(box)
+        region_box = Box(size_x=region_size_x, size_y=region_size_y)
+
+        for index in indices:
+            rect = box.rectangles[index]
+            region_rect = Rectangle(
+                name=rect.name,
+                size_x=rect._size_x,
+                size_y=rect._size_y,
+                color=rect.color
+            )
+            # Use rotation where the rectangle fits in the region
+            region_rect.rotated = rect.rotated
+            if not self.fits_region(region_rect, box):
+                region_rect.rotated = not rect.rotated
+            region_box.add_rectangle(region_rect)
+
+        return region_box
+
+
+    def seam_indices(self,
+                     box : Box) -> np.ndarray:
+        """
+        Indices of rectangles that are within seam_margin from any seam
+        between the regions.
+        """
+        x, y, size_x, size_y, _, _ = box.rectangle_arrays()
+        region_size_x, region_size_y = self.region_size(box)
+
+        margin = self.seam_margin
+        if margin is None:
+            margin = max(np.max(size_x), np.max(size_y))
+
+        near_seam = np.zeros(len(box.rectangles), dtype=bool)
+        for i in range(1, self.regions_x):
+            seam_x = box.x + i * region_size_x
+            near_seam |= (x < seam_x + margin) & (x + size_x > seam_x - margin)
+        for i in range(1, self.regions_y):
+            seam_y = box.y + i * region_size_y
+            near_seam |= (y < seam_y + margin) & (y + size_y > seam_y - margin)
+
+        return np.flatnonzero(near_seam)
+
+
+    def repair(self,
+               box : Box) -> float:
+        """
+        Boundary repair pass. Anneals the full box, but moves only the
+        rectangles that have nonzero cost or that are near region seams.
+        """
+        costs = self.cost_analyzer.rectangle_costs(box)
+        active_indices = np.union1d(np.flatnonzero(costs > 0), self.seam_indices(box))
+
+        rect_mover = ActiveRectangleMover(
+            active_indices=active_indices,
+            max_move_limit=self.rect_mover.max_move_limit,
+            min_move_limit=self.rect_mover.min_move_limit
+        )
+        self.repair_sa = SimulatedAnnealing(
+            iterations=len(active_indices) * self.repair_iterations_per_rectangle,
+            early_stop=True,
+            start_temperature=self.repair_start_temperature,
+            end_temperature=self.end_temperature,
+            rect_mover=rect_mover,
+            cost_analyzer=self.cost_analyzer,
+            batch_size=self.batch_size,
+            batch_rule=self.batch_rule,
+            verbose=False
+        )
+        self.repair_sa.optimize(box)
+
+        return self.cost_analyzer.analyze_fast(box)
+
+
+    def optimize(self,
+                 box : Box) -> None:
+        """
+        Optimization.
+        """
+        self.region_costs = []
+        self.region_iterations = []
+        self.repair_sa = None
+
+        region_size_x, region_size_y = self.region_size(box)
+        assignment = self.assign_regions(box)
+
+        regions = []
+        for indices in assignment:
+            regions.append({
+                'box' : self.make_region(box, indices),
+                'seed' : np.random.randint(2 ** 31),
+                'rect_mover' : self.rect_mover,
+                'cost_analyzer' : self.cost_analyzer,
+                'iterations_per_rectangle' : self.iterations_per_rectangle,
+                'start_temperature' : self.start_temperature,
+                'end_temperature' : self.end_temperature,
+                'batch_size' : self.batch_size,
+                'batch_rule' : self.batch_rule
+            })
+
+        # Optimize regions in parallel
+        if self.max_workers == 1:
+            results = list(map(anneal_region, regions))
+        else:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                results = list(executor.map(anneal_region, regions))
+
+        # Merge region results back to the full box. Positions are clamped
+        # inside the region, so that rounding in the offset addition does
+        # not create overlaps across the seams. Unsolved regions may return
+        # rectangles in orientation that does not fit the region, so those
+        # are rotated before clamping.
+        for region, (indices, result) in enumerate(zip(assignment, results)):
+            offset_x = box.x + (region % self.regions_x) * region_size_x
+            offset_y = box.y + (region // self.regions_x) * region_size_y
+            end_x = box.x + (region % self.regions_x + 1) * region_size_x
+            end_y = box.y + (region // self.regions_x + 1) * region_size_y
+            for i, index in enumerate(indices):
+                rect = box.rectangles[index]
+                rect.new_pos_available = False
+                rect.rotated = result['rotated'][i]
+                if not self.fits_region(rect, box):
+                    rect.rotated = not rect.rotated
+                rect.new_rotated = rect.rotated
+                rect.x = np.clip(offset_x + result['x'][i], offset_x, end_x - rect.size_x)
+                rect.y = np.clip(offset_y + result['y'][i], offset_y, end_y - rect.size_y)
+
+            self.region_costs.append(result['cost'])
+            self.region_iterations.append(result['iterations'])
+
+        cost = self.cost_analyzer.analyze_fast(box)
+        print('Region optimization result: {:0.3f}'.format(cost))
+
+        # Fix remaining problems across the region seams. Not needed when
+        # all regions reached zero cost, since the regions do not overlap.
+        regions_solved = all(region_cost == 0 for region_cost in self.region_costs)
+        if (not regions_solved) and (cost > self.cost_tolerance):
+            cost = self.repair(box)
+
+        print('Final result: {:0.3f}'.format(cost))
+        if cost > self.cost_tolerance:
+            print('Full optimization not achieved.')
@@ -33,6 +33,17 @@ class RectangleMover:
         return rect
 
     
+    def select_random_indices(self, 
+                              box : Box, 
+                              n_moves : int) -> np.ndarray: 
+        """
+        Batched version of select_random_rectangle. Returns indices to 
+        box.rectangles. 
+        """
+        indices = np.random.randint(len(box.rectangles), size=n_moves)
+        return indices
+
+    
     def make_move(self, 
                   box : Box, 
                   progress_fraction : float) -> None:
@@ -68,6 +79,66 @@ class RectangleMover:
             return
         
     
+    def propose_moves(self, 
+                      box : Box, 
+                      arrays : tuple, 
+                      progress_fraction : float, 
+                      n_moves : int) -> tuple: 
+        """
+        Batched version of make_move. Generates n_moves independent move 
+        proposals from the current state without touching the rectangles. 
+        The current state is read from arrays (see Box.rectangle_arrays). 
+        Returns numpy arrays (indices, new_x, new_y, new_rotated), where 
+        indices refer to box.rectangles. 
+        """
+        move_limit = self.max_move_limit * (1 - progress_fraction) ** 2
+        move_limit = max(move_limit, self.min_move_limit)
+        
+        x, y, size_x, size_y, rotated, _ = arrays
+        indices = self.select_random_indices(box, n_moves)
+        
+        # Each proposal moves in only x or y direction
+        moves = (np.random.rand(n_moves) - 0.5) * move_limit
+        move_in_x = np.random.rand(n_moves) < 0.5
+        move_x = np.where(move_in_x, moves, 0)
+        move_y = np.where(move_in_x, 0, moves)
+        
+        new_x = np.clip(x[indices] + move_x, 0, box.size_x - size_x[indices])
+        new_y = np.clip(y[indices] + move_y, 0, box.size_y - size_y[indices])
+        
+        rotate = np.random.rand(n_moves) < (1 - progress_fraction)
+        new_rotated = rotated[indices] != rotate
+        
+        return indices, new_x, new_y, new_rotated
+    
+    
+    def apply_move(self, 
+                   box : Box, 
+                   arrays : tuple, 
+                   index : int, 
+                   new_x : float, 
+                   new_y : float, 
+                   new_rotated : bool) -> None: 
+        """
+        Make one proposal from propose_moves effective. Updates both the 
+        rectangle and the same index in arrays, so that the arrays do not 
+        need to be collected again from the rectangles. 
+        """
+        rect = box.rectangles[index]
+        rect.x = new_x
+        rect.y = new_y
+        rect.rotated = bool(new_rotated)
+        rect.new_rotated = rect.rotated
+        rect.new_pos_available = False
+        
+        x, y, size_x, size_y, rotated, _ = arrays
+        x[index] = rect.x
+        y[index] = rect.y
+        size_x[index] = rect.size_x
+        size_y[index] = rect.size_y
+        rotated[index] = rect.rotated
+        
+    
     def deploy_moves(self, 
                     box : Box) -> None:
         """
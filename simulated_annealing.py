@@ -14,11 +14,29 @@ class SimulatedAnnealing:
                  start_temperature : float, 
                  end_temperature : float, 
                  rect_mover : RectangleMover,
-                 cost_analyzer : CostAnalyzer) -> None: 
+                 cost_analyzer : CostAnalyzer, 
+                 batch_size : int = 1, 
+                 batch_rule : str = 'metropolis', 
+                 resync_interval : int = 100, 
+                 verbose : bool = True) -> None: 
         
         # Basic params 
         self.iterations = iterations
         self.early_stop = early_stop
+        self.verbose = verbose
+        
+        # Batched step mode. With batch_size > 1 each iteration evaluates 
+        # batch_size move proposals at once, see batched_step method. 
+        if batch_size < 1: 
+            raise ValueError('batch_size must be at least 1, got {}'.format(batch_size))
+        if resync_interval < 1: 
+            raise ValueError('resync_interval must be at least 1, got {}'.format(resync_interval))
+        if batch_rule not in ('metropolis', 'heat_bath'): 
+            raise ValueError('Unknown batch_rule: {}'.format(batch_rule))
+        self.batch_size = batch_size
+        self.batch_rule = batch_rule
+        self.resync_interval = resync_interval
+        self.accepted_moves = 0
         
         # Algorithm business logic and cost analysis
         self.rect_mover = rect_mover
@@ -62,6 +80,86 @@ class SimulatedAnnealing:
             return probability
 
     
+    def acceptance_probabilities(self, 
+                                 cost : float, 
+                                 new_costs : np.ndarray) -> np.ndarray: 
+        """
+        Vectorized version of acceptance_probability for a batch of new costs. 
+        """
+        eps = 1e-12
+        probabilities = np.exp(-1 * ((new_costs + eps) / (cost + eps)) / (self.current_temperature + eps))
+        return np.where(new_costs <= cost, 1.0, probabilities)
+    
+    
+    def batched_step(self, 
+                     box : Box, 
+                     arrays : tuple, 
+                     cost : float, 
+                     progress_fraction : float) -> tuple: 
+        """
+        One iteration in batched mode. Generates batch_size move proposals 
+        from the current state, calculates all cost changes in one vectorized 
+        call and picks at most one of them using the batch_rule: 
+        
+        - metropolis: every proposal gets the normal accept/reject test and 
+        the first accepted proposal is used. This is same as running the 
+        proposals one by one until something gets accepted. 
+        
+        - heat_bath: the current state is kept with probability 
+        prod(1 - acc_probs), i.e. the probability that metropolis rejects all 
+        proposals. Otherwise proposal k is sampled with probability 
+        proportional to its acceptance probability acc_probs[k]. Acceptance 
+        probabilities come from acceptance_probability formula, so this rule 
+        follows the same annealing schedule. 
+        
+        The arrays (see Box.rectangle_arrays) are kept up to date with the 
+        accepted moves, so they are collected only once per optimization. 
+        The new cost is tracked from the deltas and re-synced with the full 
+        cost analysis every resync_interval accepted moves and when the cost 
+        gets close to zero, so that early stop sees exact zero. 
+        
+        Returns (cost, acc_prob, decision). acc_prob is 1 when the batch has a 
+        move to lower cost direction, and otherwise the probability that some 
+        move was accepted. 
+        """
+        indices, new_x, new_y, new_rotated = self.rect_mover.propose_moves(
+            box, 
+            arrays, 
+            progress_fraction=progress_fraction, 
+            n_moves=self.batch_size
+        )
+        new_costs = cost + self.cost_analyzer.analyze_moves(
+            box, arrays, indices, new_x, new_y, new_rotated
+        )
+        
+        acc_probs = self.acceptance_probabilities(cost=cost, new_costs=new_costs)
+        move_prob = 1 - np.prod(1 - acc_probs)
+        
+        if self.batch_rule == 'metropolis': 
+            accepted = np.flatnonzero(np.random.rand(len(acc_probs)) < acc_probs)
+            choice = accepted[0] if len(accepted) > 0 else None
+        else: 
+            if np.random.rand() < move_prob: 
+                choice = np.random.choice(len(acc_probs), p=acc_probs / acc_probs.sum())
+            else: 
+                choice = None
+        acc_prob = 1 if new_costs.min() <= cost else move_prob
+        
+        if choice is None: 
+            decision = 0
+        else: 
+            self.rect_mover.apply_move(
+                box, arrays, indices[choice], new_x[choice], new_y[choice], new_rotated[choice]
+            )
+            cost = new_costs[choice]
+            self.accepted_moves += 1
+            if (self.accepted_moves % self.resync_interval == 0) or (cost < 1e-9): 
+                cost = self.cost_analyzer.analyze_fast(box)
+            decision = 1
+        
+        return cost, acc_prob, decision
+    
+    
     def update_temperature(self, 
                            iteration : int) -> None: 
         """
@@ -80,7 +178,12 @@ class SimulatedAnnealing:
         Optimization. 
         """
         # Analyze starting point 
-        cost = self.cost_analyzer.analyze(box)
+        if self.batch_size > 1: 
+            cost = self.cost_analyzer.analyze_fast(box)
+            arrays = box.rectangle_arrays()
+            self.accepted_moves = 0
+        else: 
+            cost = self.cost_analyzer.analyze(box)
         
         # Run optimization
         for iteration in range(self.iterations):
@@ -88,25 +191,33 @@ class SimulatedAnnealing:
             # Update temperature for each interation round
             self.update_temperature(iteration)
             
-            # Make random move to rectangle position and analyze the cost impact
             progress_fraction = iteration / self.iterations
-            self.rect_mover.make_move(box, progress_fraction=progress_fraction)
-            new_cost = self.cost_analyzer.analyze(box)
-
-            # Get probability for accepting the new move
-            acc_prob = self.acceptance_probability(
-                cost=cost, 
-                new_cost=new_cost
-            )
-            
-            # Make decision about the new move
-            if np.random.rand() < acc_prob: 
-                self.rect_mover.deploy_moves(box)
-                cost = new_cost
-                decision = 1
+            if self.batch_size > 1: 
+                cost, acc_prob, decision = self.batched_step(
+                    box, 
+                    arrays, 
+                    cost=cost, 
+                    progress_fraction=progress_fraction
+                )
             else: 
-                self.rect_mover.reject_moves(box)
-                decision = 0
+                # Make random move to rectangle position and analyze the cost impact
+                self.rect_mover.make_move(box, progress_fraction=progress_fraction)
+                new_cost = self.cost_analyzer.analyze(box)
+
+                # Get probability for accepting the new move
+                acc_prob = self.acceptance_probability(
+                    cost=cost, 
+                    new_cost=new_cost
+                )
+                
+                # Make decision about the new move
+                if np.random.rand() < acc_prob: 
+                    self.rect_mover.deploy_moves(box)
+                    cost = new_cost
+                    decision = 1
+                else: 
+                    self.rect_mover.reject_moves(box)
+                    decision = 0
 
             # Log data for debugging purposes 
             self.rect_mover.save_history(box)
@@ -120,11 +231,13 @@ class SimulatedAnnealing:
             
             # Check if cost is zero and early stop is enabled
             if (cost == 0) and (self.early_stop == True):
-                print('Early stop at iteration {}.'.format(iteration))
-                print('Optimization achieved zero cost result.')
+                if self.verbose: 
+                    print('Early stop at iteration {}.'.format(iteration))
+                    print('Optimization achieved zero cost result.')
                 return
 
         # All iterations done. Check the final result
-        print('Final result: {:0.3f}'.format(cost))
-        if cost > 0: 
-            print('Full optimization not achieved.')
\ No newline at end of file
+        if self.verbose: 
+            print('Final result: {:0.3f}'.format(cost))
+            if cost > 0: 
+                print('Full optimization not achieved.')
\ No newline at end of file